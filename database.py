@@ -1,7 +1,74 @@
 """DDL helpers for SCD target and staging tables."""
 
+import csv
 import glob
-from typing import Any
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Explicit CSV schemas so CSV loads can skip the type/dialect sniffer
+SOURCE_COLS = {
+    "customer_id": "INTEGER",
+    "name": "VARCHAR",
+    "email": "VARCHAR",
+    "city": "VARCHAR",
+    "created_at": "TIMESTAMP",
+    "updated_at": "TIMESTAMP",
+}
+
+CDC_COLS = {
+    "customer_id": "INTEGER",
+    "name": "VARCHAR",
+    "email": "VARCHAR",
+    "city": "VARCHAR",
+    "op": "VARCHAR",
+    "change_ts": "TIMESTAMP",
+    "created_at": "TIMESTAMP",
+    "updated_at": "TIMESTAMP",
+}
+
+# Listings younger than this relative to the folder mtime are not trusted, as a
+# file added within the same mtime tick would not change the mtime
+_MTIME_GRANULARITY_NS = 2_000_000_000
+
+# absolute cdc_folder -> (folder mtime, time listed, sorted tuple of CDC file paths)
+_cdc_files_cache: Dict[str, Tuple[int, int, Tuple[str, ...]]] = {}
+
+
+def check_csv_header(path: str, columns: dict) -> None:
+    """Raise ValueError unless the file's header row matches the schema's column order.
+
+    Loads with an explicit schema match columns by position, not by name,
+    so a reordered file would otherwise load into the wrong columns silently.
+    """
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), [])
+    if header != list(columns):
+        raise ValueError(f"{path}: expected columns {list(columns)}, got {header}")
+
+
+def csv_reader(columns: dict) -> str:
+    """Build a read_csv call with a fixed schema and no auto-detection.
+
+    The file path (or list of paths) is bound to the ``?`` placeholder.
+    Columns are read by position; check headers with check_csv_header first.
+    """
+    col_spec = ", ".join(f"'{name}': '{dtype}'" for name, dtype in columns.items())
+    return (
+        f"read_csv(?, columns = {{{col_spec}}}, "
+        "header = true, delim = ',', auto_detect = false)"
+    )
+
+
+def configure_connection(conn: Any, threads: Optional[int] = None, memory_limit: Optional[str] = None) -> None:
+    """Set DuckDB worker threads and memory limit.
+
+    Settings left as None keep DuckDB's own defaults (detected cores, 80% of RAM).
+    """
+    if threads is not None:
+        conn.execute(f"PRAGMA threads={threads}")
+    if memory_limit is not None:
+        conn.execute(f"PRAGMA memory_limit='{memory_limit}'")
 
 
 def scd1_target_ddl() -> str:
@@ -64,34 +131,76 @@ def create_stage_tables(conn: Any) -> None:
     conn.execute(cdc_stage_ddl())
 
 
-def load_cdc_to_stage(conn: Any, cdc_folder: str = "data/cdc") -> int:
+def list_cdc_files(cdc_folder: str = "data/cdc") -> list:
+    """List customers_cdc*.csv files in folder, sorted.
+
+    Returns absolute paths. The listing is cached per absolute folder path
+    until the folder's mtime changes (a file is added, removed or renamed).
+    """
+    folder = os.path.abspath(cdc_folder)
+    try:
+        mtime = os.stat(folder).st_mtime_ns
+    except FileNotFoundError:
+        return []
+
+    cached = _cdc_files_cache.get(folder)
+    if cached is not None and cached[0] == mtime and cached[1] - mtime >= _MTIME_GRANULARITY_NS:
+        return list(cached[2])
+
+    listed_at = time.time_ns()
+    cdc_files = sorted(glob.glob(os.path.join(folder, "customers_cdc*.csv")))
+    _cdc_files_cache[folder] = (mtime, listed_at, tuple(cdc_files))
+    return cdc_files
+
+
+def load_cdc_to_stage(
+    conn: Any,
+    cdc_folder: str = "data/cdc",
+    dedup: bool = True,
+    files: Optional[list] = None,
+) -> int:
     """Load all CDC CSV files from folder into staging table.
 
-    Reads all customers_cdc*.csv files and inserts into cdc_stage.
-    Keeps only latest record per customer by change_ts.
+    Reads all customers_cdc*.csv files (or the given files) and inserts
+    into cdc_stage. Keeps only latest record per customer by change_ts;
+    pass dedup=False to skip that pass when the files hold at most one
+    row per customer.
     Returns the number of records loaded.
     """
-    cdc_files = sorted(glob.glob(f"{cdc_folder}/customers_cdc*.csv"))
+    cdc_files = files if files is not None else list_cdc_files(cdc_folder)
 
     if not cdc_files:
         return 0
 
-    # Build UNION ALL of all CDC files
-    file_queries = [f"SELECT * FROM read_csv_auto('{f}')" for f in cdc_files]
-    union_query = " UNION ALL ".join(file_queries)
-
-    # Load with deduplication - keep only latest record per customer
-    conn.execute(f"""
-        INSERT INTO cdc_stage
-        SELECT customer_id, name, email, city, op, change_ts, created_at, updated_at
-        FROM (
-            SELECT *, ROW_NUMBER() OVER (PARTITION BY customer_id ORDER BY change_ts DESC) as rn
-            FROM ({union_query})
-        )
-        WHERE rn = 1
-    """)
+    for cdc_file in cdc_files:
+        check_csv_header(cdc_file, CDC_COLS)
+
+    # Scan all CDC files in one multi-file read so DuckDB can parallelize it
+    cdc_reader = csv_reader(CDC_COLS)
+
+    if dedup:
+        # Keep only latest record per customer. ARG_MAX takes the whole row
+        # so NULL columns are not back-filled from older rows; ANY_VALUE keeps
+        # customers whose rows all have a NULL change_ts.
+        query = f"""
+            INSERT INTO cdc_stage
+            SELECT UNNEST(latest)
+            FROM (
+                SELECT COALESCE(ARG_MAX(r, change_ts), ANY_VALUE(r)) AS latest
+                FROM {cdc_reader} r
+                GROUP BY customer_id
+            )
+        """
+    else:
+        query = f"""
+            INSERT INTO cdc_stage
+            SELECT customer_id, name, email, city, op, change_ts, created_at, updated_at
+            FROM {cdc_reader}
+        """
+
+    # INSERT reports its affected-row count, so no follow-up COUNT(*) is needed
+    total_records = conn.execute(query, [cdc_files]).fetchone()[0]
 
-    total_records = conn.execute("SELECT COUNT(*) FROM cdc_stage").fetchone()[0]
     print(f"Loaded {total_records} CDC records")
 
     return total_records
@@ -102,25 +211,41 @@ def load_source_to_target(conn: Any, source_file: str = "data/source/customers.c
 
     Returns the number of records loaded.
     """
+    check_csv_header(source_file, SOURCE_COLS)
+
+    # Bulk-load the source CSV once with COPY and feed both targets from the
+    # temp table; COPY reports the number of rows it loaded
+    col_defs = ", ".join(f"{name} {dtype}" for name, dtype in SOURCE_COLS.items())
+    conn.execute(f"CREATE OR REPLACE TEMP TABLE _src ({col_defs})")
+    count = conn.execute(
+        "COPY _src FROM ? (HEADER, DELIMITER ',', AUTO_DETECT false)",
+        [source_file],
+    ).fetchone()[0]
+
     # Load into SCD1 target
-    conn.execute(f"""
+    conn.execute("""
         INSERT INTO scd1_target (customer_id, name, email, city, created_at, updated_at)
         SELECT customer_id, name, email, city, created_at, updated_at
-        FROM read_csv_auto('{source_file}')
+        FROM _src
     """)
 
     # Load into SCD2 target with initial effective dates
-    conn.execute(f"""
+    conn.execute("""
         INSERT INTO scd2_target (customer_id, name, email, city, effective_from, effective_to, is_current, created_at, updated_at)
         SELECT customer_id, name, email, city, created_at, NULL, TRUE, created_at, updated_at
-        FROM read_csv_auto('{source_file}')
+        FROM _src
     """)
 
-    count = conn.execute(f"SELECT COUNT(*) FROM read_csv_auto('{source_file}')").fetchone()[0]
+    conn.execute("DROP TABLE _src")
     print(f"Loaded {count} source records into target tables")
     return count
 
 
+def truncate_stage_tables(conn: Any) -> None:
+    """Empty staging table, keeping it for the next run."""
+    conn.execute("TRUNCATE cdc_stage")
+
+
 def drop_stage_tables(conn: Any) -> None:
     """Drop staging table."""
     conn.execute("DROP TABLE IF EXISTS cdc_stage")
@@ -138,6 +263,7 @@ if __name__ == "__main__":
     import duckdb
 
     con = duckdb.connect(database='data/warehouse.duckdb')
+    configure_connection(con)
 
     # Drop existing tables for clean start
     drop_all_tables(con)
@@ -4,8 +4,8 @@ SCD Type 1 using persistent DuckDB and MERGE command.
 How it works:
 - Connects to persistent database.
 - Loads CDC from `data/cdc/cdc_*.csv` into staging table
-- Applies changes using MERGE (inserts/updates) and DELETE
-- Drops staging table after merge
+- Applies changes using a single MERGE (inserts/updates/deletes)
+- Truncates staging table after merge (kept for the next run)
 
 Notes: 
     We use MERGE for set-based operations. 
@@ -15,68 +15,72 @@ Notes:
 import duckdb
 import os
 from database import (
+    configure_connection,
     create_stage_tables,
     load_cdc_to_stage,
-    drop_stage_tables,
+    truncate_stage_tables,
 )
 
+# Max rows shown by the before/after previews
+PREVIEW_ROWS = 20
 
-def run_scd1():
-    here = os.path.dirname(__file__)
-    data_dir = os.path.join(here, "data")
-    cdc_folder = os.path.join(data_dir, "cdc")
-
-    # Connect to persistent database (already initialized with source data by database.py)
-    con = duckdb.connect(database='data/warehouse.duckdb')
-
-    # Create staging table for CDC
-    create_stage_tables(con)
-
-    print("Before CDC (SCD1 target):")
-    print(con.execute("SELECT * FROM scd1_target ORDER BY customer_id").fetchdf())
-
-    # Load all CDC files into staging
-    load_cdc_to_stage(con, cdc_folder)
-
-    print("\nCDC Stage table contents:")
-    print(con.execute("SELECT * FROM cdc_stage ORDER BY change_ts").fetchdf())
-
-    # Handle deletes from staging
-    con.execute(
-        """
-        DELETE FROM scd1_target
-        WHERE customer_id IN (SELECT customer_id FROM cdc_stage WHERE op = 'D')
-        """
-    )
 
-    # For SCD1, use MERGE to apply inserts/updates from staging
+def apply_scd1(con):
+    """Apply the CDC rows in cdc_stage to scd1_target."""
+    # For SCD1, use a single MERGE to apply deletes, updates and inserts from staging
     con.execute(
         """
         MERGE INTO scd1_target t
         USING (
-            SELECT customer_id, name, email, city, created_at, updated_at
+            SELECT customer_id, name, email, city, op, created_at, updated_at
             FROM cdc_stage 
-            WHERE op IN ('I','U')
+            WHERE op IN ('I','U','D')
         ) s
         ON t.customer_id = s.customer_id
+        WHEN MATCHED AND s.op = 'D' THEN
+            DELETE
         WHEN MATCHED THEN
             UPDATE SET 
                 name = s.name, 
                 email = s.email, 
                 city = s.city,
                 updated_at = s.updated_at
-        WHEN NOT MATCHED THEN
+        WHEN NOT MATCHED AND s.op IN ('I','U') THEN
             INSERT (customer_id, name, email, city, created_at, updated_at) 
             VALUES (s.customer_id, s.name, s.email, s.city, s.created_at, s.updated_at)
         """
     )
 
+
+def run_scd1():
+    here = os.path.dirname(__file__)
+    data_dir = os.path.join(here, "data")
+    cdc_folder = os.path.join(data_dir, "cdc")
+
+    # Connect to persistent database (already initialized with source data by database.py)
+    con = duckdb.connect(database='data/warehouse.duckdb')
+    configure_connection(con)
+
+    # Create staging table for CDC
+    create_stage_tables(con)
+
+    print("Before CDC (SCD1 target):")
+    print(con.execute(f"SELECT * FROM scd1_target ORDER BY customer_id LIMIT {PREVIEW_ROWS}").fetchdf())
+
+    # Load all CDC files into staging
+    load_cdc_to_stage(con, cdc_folder)
+
+    print("\nCDC Stage table contents:")
+    print(con.execute(f"SELECT * FROM cdc_stage ORDER BY change_ts LIMIT {PREVIEW_ROWS}").fetchdf())
+
+    apply_scd1(con)
+
     print('\nAfter applying CDC (SCD1 semantics - overwrite):')
-    print(con.execute("SELECT * FROM scd1_target ORDER BY customer_id").fetchdf())
+    print(con.execute(f"SELECT * FROM scd1_target ORDER BY customer_id LIMIT {PREVIEW_ROWS}").fetchdf())
 
-    # Drop staging table after merge
-    drop_stage_tables(con)
-    print("\nStaging table dropped.")
+    # Empty staging table after merge
+    truncate_stage_tables(con)
+    print("\nStaging table truncated.")
 
     con.close()
     print("SCD1 processing complete.")
@@ -8,7 +8,7 @@ How it works:
   - For updates (U): expires the current row (sets effective_to and is_current=false) and inserts a new row
   - For inserts (I): inserts a new current row
   - For deletes (D): expires the current row
-- Drops staging table after merge
+- Truncates staging table after merge (kept for the next run)
 
 Notes: 
     We use set-based SQL (UPDATE/INSERT) to implement SCD2. 
@@ -18,11 +18,85 @@ Notes:
 import duckdb
 import os
 from database import (
+    configure_connection,
     create_stage_tables,
     load_cdc_to_stage,
-    drop_stage_tables,
+    truncate_stage_tables,
 )
 
+# Max rows shown by the before/after previews
+PREVIEW_ROWS = 20
+
+
+def apply_scd2(con):
+    """Apply the CDC rows in cdc_stage to scd2_target."""
+    # Updates are read by both the expire and the new-version statements, so filter them once
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE cdc_u AS
+        SELECT customer_id, name, email, city, change_ts, created_at, updated_at
+        FROM cdc_stage WHERE op = 'U'
+        """
+    )
+
+    # Apply all changes in one transaction (single commit)
+    con.execute("BEGIN TRANSACTION")
+    try:
+        # Expire current rows for updates where values actually changed
+        con.execute(
+            """
+            UPDATE scd2_target
+            SET effective_to = stg.change_ts, is_current = false, updated_at = stg.change_ts
+            FROM cdc_u stg
+            WHERE scd2_target.customer_id = stg.customer_id
+              AND scd2_target.is_current = TRUE
+              AND (scd2_target.name IS DISTINCT FROM stg.name 
+                   OR scd2_target.email IS DISTINCT FROM stg.email 
+                   OR scd2_target.city IS DISTINCT FROM stg.city)
+            """
+        )
+
+        # Insert new current rows in one statement: every insert, plus a new
+        # version for each update whose customer has no current row (expired above)
+        con.execute(
+            """
+            INSERT INTO scd2_target (customer_id, name, email, city, effective_from, effective_to, is_current, created_at, updated_at)
+            SELECT s.customer_id, s.name, s.email, s.city, 
+                   s.change_ts, NULL, TRUE, s.created_at, s.updated_at
+            FROM cdc_stage s
+            WHERE s.op = 'I'
+            UNION ALL
+            SELECT s.customer_id, s.name, s.email, s.city, 
+                   s.change_ts, NULL, TRUE, s.created_at, s.updated_at
+            FROM cdc_u s
+            WHERE NOT EXISTS (
+                  SELECT 1 FROM scd2_target t 
+                  WHERE t.customer_id = s.customer_id AND t.is_current = TRUE
+              )
+            """
+        )
+
+        # Handle deletes: expire current rows
+        con.execute(
+            """
+            UPDATE scd2_target
+            SET effective_to = stg.change_ts, is_current = false, updated_at = stg.change_ts
+            FROM (
+                SELECT customer_id, change_ts 
+                FROM cdc_stage WHERE op = 'D'
+            ) stg
+            WHERE scd2_target.customer_id = stg.customer_id
+              AND scd2_target.is_current = TRUE
+            """
+        )
+
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.execute("DROP TABLE IF EXISTS cdc_u")
+
 
 def run_scd2():
     here = os.path.dirname(__file__)
@@ -31,83 +105,28 @@ def run_scd2():
 
     # Connect to persistent database (already initialized with source data by database.py)
     con = duckdb.connect(database='data/warehouse.duckdb')
+    configure_connection(con)
 
     # Create staging table for CDC
     create_stage_tables(con)
 
     print("Before CDC (SCD2 target):")
-    print(con.execute("SELECT * FROM scd2_target ORDER BY customer_id, effective_from").fetchdf())
+    print(con.execute(f"SELECT * FROM scd2_target ORDER BY customer_id, effective_from LIMIT {PREVIEW_ROWS}").fetchdf())
 
     # Load all CDC files into staging
     load_cdc_to_stage(con, cdc_folder)
 
     print("\nCDC Stage table contents:")
-    print(con.execute("SELECT * FROM cdc_stage ORDER BY change_ts").fetchdf())
+    print(con.execute(f"SELECT * FROM cdc_stage ORDER BY change_ts LIMIT {PREVIEW_ROWS}").fetchdf())
 
-    # Expire current rows for updates where values actually changed
-    con.execute(
-        """
-        UPDATE scd2_target
-        SET effective_to = stg.change_ts, is_current = false, updated_at = stg.change_ts
-        FROM (
-            SELECT customer_id, name AS new_name, email AS new_email, city AS new_city, 
-                   CAST(change_ts AS TIMESTAMP) as change_ts 
-            FROM cdc_stage WHERE op = 'U'
-        ) stg
-        WHERE scd2_target.customer_id = stg.customer_id
-          AND scd2_target.is_current = TRUE
-          AND (scd2_target.name IS DISTINCT FROM stg.new_name 
-               OR scd2_target.email IS DISTINCT FROM stg.new_email 
-               OR scd2_target.city IS DISTINCT FROM stg.new_city)
-        """
-    )
-
-    # Insert new versions for updates (where row was expired)
-    con.execute(
-        """
-        INSERT INTO scd2_target (customer_id, name, email, city, effective_from, effective_to, is_current, created_at, updated_at)
-        SELECT s.customer_id, s.name, s.email, s.city, 
-               CAST(s.change_ts AS TIMESTAMP), NULL, TRUE, s.created_at, s.updated_at
-        FROM cdc_stage s
-        WHERE s.op = 'U'
-          AND NOT EXISTS (
-              SELECT 1 FROM scd2_target t 
-              WHERE t.customer_id = s.customer_id AND t.is_current = TRUE
-          )
-        """
-    )
-
-    # Handle inserts: insert new current rows
-    con.execute(
-        """
-        INSERT INTO scd2_target (customer_id, name, email, city, effective_from, effective_to, is_current, created_at, updated_at)
-        SELECT s.customer_id, s.name, s.email, s.city, 
-               CAST(s.change_ts AS TIMESTAMP), NULL, TRUE, s.created_at, s.updated_at
-        FROM cdc_stage s
-        WHERE s.op = 'I'
-        """
-    )
-
-    # Handle deletes: expire current rows
-    con.execute(
-        """
-        UPDATE scd2_target
-        SET effective_to = stg.change_ts, is_current = false, updated_at = stg.change_ts
-        FROM (
-            SELECT customer_id, CAST(change_ts AS TIMESTAMP) as change_ts 
-            FROM cdc_stage WHERE op = 'D'
-        ) stg
-        WHERE scd2_target.customer_id = stg.customer_id
-          AND scd2_target.is_current = TRUE
-        """
-    )
+    apply_scd2(con)
 
     print('\nAfter applying CDC (SCD2 semantics):')
-    print(con.execute("SELECT * FROM scd2_target ORDER BY customer_id, effective_from").fetchdf())
+    print(con.execute(f"SELECT * FROM scd2_target ORDER BY customer_id, effective_from LIMIT {PREVIEW_ROWS}").fetchdf())
 
-    # Drop staging table after merge
-    drop_stage_tables(con)
-    print("\nStaging table dropped.")
+    # Empty staging table after merge
+    truncate_stage_tables(con)
+    print("\nStaging table truncated.")
 
     con.close()
     print("SCD2 processing complete.")
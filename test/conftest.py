@@ -0,0 +1,41 @@
+import importlib.util
+import os
+import sys
+
+import duckdb
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import create_stage_tables, create_tables  # noqa: E402
+
+CDC_HEADER = "customer_id,name,email,city,op,change_ts,created_at,updated_at\n"
+
+
+def load_script(filename):
+    """Import a hyphenated top-level script (e.g. scd-type2.py) as a module."""
+    name = filename.replace("-", "_").removesuffix(".py")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def con():
+    """In-memory warehouse with empty target and staging tables."""
+    conn = duckdb.connect()
+    create_tables(conn)
+    create_stage_tables(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def write_cdc(tmp_path):
+    """Write CDC rows (CSV lines without header) to a customers_cdc file."""
+    def _write(*rows, name="customers_cdc1.csv"):
+        (tmp_path / name).write_text(CDC_HEADER + "".join(f"{row}\n" for row in rows))
+        return str(tmp_path)
+    return _write
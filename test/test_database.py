@@ -0,0 +1,111 @@
+import os
+
+import duckdb
+import pytest
+
+from conftest import CDC_HEADER
+from database import configure_connection, list_cdc_files, load_cdc_to_stage, load_source_to_target
+
+
+def test_dedup_keeps_null_columns_of_latest_row(con, write_cdc):
+    cdc_folder = write_cdc(
+        "1,Old Name,old@example.in,OldCity,U,2024-01-15 10:00:00,2024-01-01 09:00:00,2024-01-15 10:00:00",
+        "1,New Name,new@example.in,,U,2024-01-20 10:00:00,2024-01-01 09:00:00,2024-01-20 10:00:00",
+    )
+
+    assert load_cdc_to_stage(con, cdc_folder) == 1
+    assert con.execute("SELECT name, email, city FROM cdc_stage").fetchall() == [
+        ("New Name", "new@example.in", None),
+    ]
+
+
+def test_dedup_keeps_row_with_null_change_ts(con, write_cdc):
+    cdc_folder = write_cdc(
+        "2,Priya Patel,priya.patel@example.in,Pune,U,,2024-01-01 09:15:00,2024-01-15 10:30:00",
+    )
+
+    assert load_cdc_to_stage(con, cdc_folder) == 1
+    assert con.execute("SELECT customer_id, city, op, change_ts FROM cdc_stage").fetchall() == [
+        (2, "Pune", "U", None),
+    ]
+
+
+def test_list_cdc_files_returns_copy_of_cached_listing(write_cdc):
+    cdc_folder = write_cdc("1,A,a@example.in,Mumbai,I,2024-01-15 10:00:00,2024-01-15 10:00:00,2024-01-15 10:00:00")
+
+    files = list_cdc_files(cdc_folder)
+    files.append("bogus.csv")
+
+    assert list_cdc_files(cdc_folder) == [f"{cdc_folder}/customers_cdc1.csv"]
+
+
+def test_configure_connection_keeps_duckdb_defaults_unless_given():
+    conn = duckdb.connect()
+    defaults = conn.execute("SELECT current_setting('threads'), current_setting('memory_limit')").fetchone()
+
+    configure_connection(conn)
+    assert conn.execute("SELECT current_setting('threads'), current_setting('memory_limit')").fetchone() == defaults
+
+    configure_connection(conn, threads=2, memory_limit="1GB")
+    threads, memory_limit = conn.execute(
+        "SELECT current_setting('threads'), current_setting('memory_limit')"
+    ).fetchone()
+    assert threads == 2
+    assert memory_limit != defaults[1]
+    conn.close()
+
+
+def test_load_rejects_reordered_csv_columns(con, tmp_path):
+    swapped = CDC_HEADER.replace("created_at,updated_at", "updated_at,created_at")
+    (tmp_path / "customers_cdc1.csv").write_text(
+        swapped + "1,A,a@example.in,Mumbai,U,2024-01-15 10:00:00,2024-01-15 10:00:00,2024-01-01 09:00:00\n"
+    )
+    source = tmp_path / "customers.csv"
+    source.write_text("customer_id,name,email,city,updated_at,created_at\n")
+
+    with pytest.raises(ValueError, match="expected columns"):
+        load_cdc_to_stage(con, str(tmp_path))
+    with pytest.raises(ValueError, match="expected columns"):
+        load_source_to_target(con, str(source))
+
+
+def test_load_without_dedup_keeps_every_row(con, write_cdc):
+    cdc_folder = write_cdc(
+        "1,Old Name,old@example.in,OldCity,U,2024-01-15 10:00:00,2024-01-01 09:00:00,2024-01-15 10:00:00",
+        "1,New Name,new@example.in,NewCity,U,2024-01-20 10:00:00,2024-01-01 09:00:00,2024-01-20 10:00:00",
+        "2,Priya Patel,priya.patel@example.in,Pune,I,2024-01-20 11:00:00,2024-01-20 11:00:00,2024-01-20 11:00:00",
+    )
+
+    assert load_cdc_to_stage(con, cdc_folder, dedup=False) == 3
+    assert con.execute("SELECT customer_id, city FROM cdc_stage ORDER BY change_ts").fetchall() == [
+        (1, "OldCity"),
+        (1, "NewCity"),
+        (2, "Pune"),
+    ]
+
+
+def test_list_cdc_files_is_keyed_on_absolute_folder(tmp_path, monkeypatch, write_cdc):
+    other = tmp_path / "other"
+    (other / "cdc").mkdir(parents=True)
+    write_cdc("1,A,a@example.in,Mumbai,I,2024-01-15 10:00:00,2024-01-15 10:00:00,2024-01-15 10:00:00")
+    (tmp_path / "cdc").mkdir()
+    os.replace(tmp_path / "customers_cdc1.csv", tmp_path / "cdc" / "customers_cdc1.csv")
+
+    monkeypatch.chdir(tmp_path)
+    assert list_cdc_files("cdc") == [str(tmp_path / "cdc" / "customers_cdc1.csv")]
+
+    monkeypatch.chdir(other)
+    assert list_cdc_files("cdc") == []
+
+
+def test_list_cdc_files_sees_file_added_in_same_mtime_tick(tmp_path, write_cdc):
+    row = "1,A,a@example.in,Mumbai,I,2024-01-15 10:00:00,2024-01-15 10:00:00,2024-01-15 10:00:00"
+    cdc_folder = write_cdc(row)
+    first_mtime = os.stat(cdc_folder).st_mtime_ns
+    assert len(list_cdc_files(cdc_folder)) == 1
+
+    # Simulate a coarse-mtime filesystem: the new file leaves the mtime unchanged
+    write_cdc(row, name="customers_cdc2.csv")
+    os.utime(cdc_folder, ns=(first_mtime, first_mtime))
+
+    assert len(list_cdc_files(cdc_folder)) == 2
@@ -0,0 +1,30 @@
+import os
+
+from conftest import ROOT, load_script
+from database import load_cdc_to_stage, load_source_to_target
+
+scd1 = load_script("scd-type1.py")
+
+
+def test_merge_applies_deletes_updates_and_inserts(con, write_cdc):
+    load_source_to_target(con, os.path.join(ROOT, "data/source/customers.csv"))
+    cdc_folder = write_cdc(
+        "2,Priya Patel,priya.patel@example.in,Pune,U,2024-01-25 09:30:00,2024-01-01 09:15:00,2024-01-25 09:30:00",
+        "3,Rohan Gupta,rohan.gupta@example.in,Bangalore,D,2024-01-25 10:00:00,2024-01-01 09:30:00,2024-01-25 10:00:00",
+        "98,Ghost,ghost@example.in,Nowhere,D,2024-01-25 10:30:00,2024-01-01 09:45:00,2024-01-25 10:30:00",
+        "99,Manish Tiwari,manish.tiwari@example.in,Noida,I,2024-01-25 11:00:00,2024-01-25 11:00:00,2024-01-25 11:00:00",
+    )
+    load_cdc_to_stage(con, cdc_folder)
+
+    scd1.apply_scd1(con)
+
+    rows = con.execute("""
+        SELECT customer_id, city, updated_at::VARCHAR FROM scd1_target
+        WHERE customer_id IN (2, 3, 98, 99)
+        ORDER BY customer_id
+    """).fetchall()
+    assert rows == [
+        (2, "Pune", "2024-01-25 09:30:00"),
+        (99, "Noida", "2024-01-25 11:00:00"),
+    ]
+    assert con.execute("SELECT COUNT(*) FROM scd1_target").fetchone()[0] == 20
@@ -0,0 +1,56 @@
+import os
+
+import duckdb
+import pytest
+
+from conftest import ROOT, load_script
+from database import load_cdc_to_stage, load_source_to_target
+
+scd2 = load_script("scd-type2.py")
+
+
+def test_changed_update_gets_new_version_in_mixed_batch(con, write_cdc):
+    # Several threads make the MERGE's execution order vary between runs
+    con.execute("PRAGMA threads=4")
+    load_source_to_target(con, os.path.join(ROOT, "data/source/customers.csv"))
+    cdc_folder = write_cdc(
+        "1,Aarav Sharma,aarav.sharma@example.in,Mumbai,U,2024-01-25 09:00:00,2024-01-01 09:00:00,2024-01-25 09:00:00",
+        "2,Priya Patel,priya.patel@example.in,Pune,U,2024-01-25 09:30:00,2024-01-01 09:15:00,2024-01-25 09:30:00",
+        "99,Ghost,ghost@example.in,Nowhere,U,2024-01-25 10:00:00,2024-01-01 09:45:00,2024-01-25 10:00:00",
+    )
+    load_cdc_to_stage(con, cdc_folder)
+
+    scd2.apply_scd2(con)
+
+    rows = con.execute("""
+        SELECT customer_id, city, is_current FROM scd2_target
+        WHERE customer_id IN (1, 2, 99)
+        ORDER BY customer_id, effective_from
+    """).fetchall()
+    assert rows == [
+        (1, "Mumbai", True),
+        (2, "Delhi", False),
+        (2, "Pune", True),
+        (99, "Nowhere", True),
+    ]
+
+
+def test_failed_apply_rolls_back_and_drops_temp_table(con, write_cdc):
+    load_source_to_target(con, os.path.join(ROOT, "data/source/customers.csv"))
+    # An insert with no change_ts violates this, after updates were already expired
+    con.execute("ALTER TABLE scd2_target ALTER COLUMN effective_from SET NOT NULL")
+    cdc_folder = write_cdc(
+        "2,Priya Patel,priya.patel@example.in,Pune,U,2024-01-25 09:30:00,2024-01-01 09:15:00,2024-01-25 09:30:00",
+        "98,Nobody,nobody@example.in,Nowhere,I,,2024-01-25 10:00:00,2024-01-25 10:00:00",
+    )
+    load_cdc_to_stage(con, cdc_folder)
+
+    with pytest.raises(duckdb.ConstraintException):
+        scd2.apply_scd2(con)
+
+    assert con.execute(
+        "SELECT city, is_current FROM scd2_target WHERE customer_id = 2"
+    ).fetchall() == [("Delhi", True)]
+    assert con.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'cdc_u'"
+    ).fetchone()[0] == 0